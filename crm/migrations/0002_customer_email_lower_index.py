@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-15 17:44
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='cust_email_lower'),
+        ),
+    ]
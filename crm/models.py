@@ -1,3 +1,62 @@
+from decimal import Decimal
+
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+
+class TimeStampedModel(models.Model):
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class Customer(TimeStampedModel):
+    name = models.CharField(max_length=255)
+    email = models.EmailField(unique=True)
+    phone = models.CharField(max_length=32, blank=True)
+
+    class Meta:
+        ordering = ["name"]
+        constraints = [models.UniqueConstraint(Lower("email"), name="cust_email_lower")]
+
+    def __str__(self):
+        return self.name
+
+
+class Product(TimeStampedModel):
+    name = models.CharField(max_length=255)
+    price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal("0.01"))],
+    )
+    stock = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["name"]
+        indexes = [models.Index(fields=["name"], name="product_name")]
+
+    def __str__(self):
+        return self.name
+
+
+class Order(TimeStampedModel):
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="orders")
+    products = models.ManyToManyField(Product, related_name="orders")
+    total_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal("0.00"))],
+    )
+    order_date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-order_date"]
+        indexes = [models.Index(fields=["-order_date"], name="order_date_desc")]
 
-# Create your models here.
+    def __str__(self):
+        return f"Order #{self.pk}"
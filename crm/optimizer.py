@@ -0,0 +1,141 @@
+"""Shape CRM querysets from the GraphQL selection set to avoid N+1 queries."""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+SELECT = "select"
+PREFETCH = "prefetch"
+
+# Relation fields exposed by the CRM types and how each one is joined.
+RELATED_FIELDS = {
+    "orders": PREFETCH,
+    "customer": SELECT,
+    "products": PREFETCH,
+}
+
+
+def collect_fields(selection_set, fragments, fields=None):
+    """Return the selection set as a ``{snake_case_name: subfields}`` tree."""
+    if fields is None:
+        fields = {}
+    if selection_set is None:
+        return fields
+
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            name = to_snake_case(selection.name.value)
+            collect_fields(selection.selection_set, fragments, fields.setdefault(name, {}))
+        elif isinstance(selection, InlineFragmentNode):
+            collect_fields(selection.selection_set, fragments, fields)
+        elif isinstance(selection, FragmentSpreadNode):
+            collect_fields(fragments[selection.name.value].selection_set, fragments, fields)
+    return fields
+
+
+def node_fields(fields):
+    """Unwrap ``edges { node { ... } }`` so connections and lists look alike."""
+    if "edges" in fields:
+        return fields["edges"].get("node", {})
+    return fields
+
+
+def requested_fields(info):
+    """Return the fields requested on the objects resolved by ``info``."""
+    fields = {}
+    for field_node in info.field_nodes:
+        collect_fields(field_node.selection_set, info.fragments, fields)
+    return node_fields(fields)
+
+
+def optimize_queryset(queryset, info):
+    """Add the joins, prefetches and column projection the query needs."""
+    return _optimize(queryset, requested_fields(info))
+
+
+def _optimize(queryset, fields, required=()):
+    select, prefetch = [], []
+    _plan(queryset.model, fields, "", select, prefetch)
+
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+
+    columns = _columns(queryset.model, fields, select, "")
+    if columns is not None:
+        # Related managers attach their owner through the foreign key column.
+        owners = [field.name for field in queryset._known_related_objects]
+        queryset = queryset.only(*columns, *required, *owners, *_ordering_columns(queryset))
+    return queryset
+
+
+def _plan(model, fields, prefix, select, prefetch):
+    for name, subfields in fields.items():
+        kind = RELATED_FIELDS.get(name)
+        if kind is None:
+            continue
+        if "edges" in subfields:
+            # Connection fields filter and paginate their own querysets, which
+            # discards anything prefetched for them; the node types optimize
+            # those querysets in their own resolvers instead.
+            continue
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+
+        path = prefix + name
+        related_model = field.related_model
+        if kind == SELECT:
+            select.append(path)
+            _plan(related_model, subfields, path + "__", select, prefetch)
+        else:
+            # Reverse foreign keys are matched back to their parent through
+            # the foreign key column, so it has to survive the projection.
+            required = (field.field.name,) if field.one_to_many else ()
+            queryset = _optimize(related_model._default_manager.all(), subfields, required)
+            prefetch.append(Prefetch(path, queryset=queryset))
+
+
+def _columns(model, fields, select, prefix):
+    """Return the ``only()`` names for ``fields``, or None if a field isn't a model field."""
+    columns = []
+    for name, subfields in fields.items():
+        if name in ("id", "__typename"):
+            continue
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Resolved by custom code that may read any column.
+            return None
+
+        path = prefix + name
+        if not field.is_relation:
+            columns.append(path)
+        elif path in select:
+            related = _columns(field.related_model, subfields, select, path + "__")
+            columns.append(path)
+            if related is not None:
+                columns.append(f"{path}__{field.related_model._meta.pk.name}")
+                columns.extend(related)
+        elif field.many_to_one:
+            columns.append(path)
+    return columns
+
+
+def queryset_ordering(queryset):
+    """Return the ordering the queryset will actually be sorted by."""
+    if queryset.query.order_by:
+        return queryset.query.order_by
+    if queryset.query.default_ordering:
+        return queryset.model._meta.ordering
+    return ()
+
+
+def _ordering_columns(queryset):
+    return [
+        name.lstrip("-")
+        for name in queryset_ordering(queryset)
+        if isinstance(name, str) and "__" not in name and name != "?"
+    ]
@@ -0,0 +1,130 @@
+"""Keyset (cursor) pagination for the CRM relay connections."""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q, QuerySet
+from graphene.relay import PageInfo
+from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.utils import maybe_queryset
+from graphql_relay import cursor_to_offset
+
+from .optimizer import queryset_ordering
+
+
+def _keyset_ordering(queryset):
+    """Return ``(field, descending)`` if the queryset is ordered by at most one plain column."""
+    ordering = queryset_ordering(queryset)
+    if not ordering:
+        return "pk", False
+    if len(ordering) != 1 or not isinstance(ordering[0], str):
+        return None
+
+    field = ordering[0].lstrip("-")
+    descending = ordering[0].startswith("-")
+    if field in ("pk", queryset.model._meta.pk.name):
+        return "pk", descending
+    try:
+        model_field = queryset.model._meta.get_field(field)
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete or model_field.is_relation:
+        return None
+    return field, descending
+
+
+def encode_cursor(node, field):
+    value = getattr(node, field)
+    payload = [node.pk] if field == "pk" else [value, node.pk]
+    return base64.b64encode(json.dumps(payload, default=str).encode()).decode()
+
+
+def decode_cursor(cursor, field):
+    """Return ``(value, pk)`` from a cursor issued for an ordering on ``field``."""
+    try:
+        payload = json.loads(base64.b64decode(cursor, validate=True))
+    except ValueError:
+        payload = None
+    size = 1 if field == "pk" else 2
+    if not isinstance(payload, list) or len(payload) != size or not isinstance(payload[-1], int):
+        raise Exception("Invalid cursor")
+    return (None, payload[0]) if size == 1 else (payload[0], payload[1])
+
+
+def _beyond(field, value, pk, lookup):
+    """Match rows past ``(value, pk)`` in the ``(field, pk)`` ordering."""
+    condition = Q(**{f"pk__{lookup}": pk})
+    if field != "pk":
+        condition = Q(**{f"{field}__{lookup}": value}) | (Q(**{field: value}) & condition)
+    return condition
+
+
+class KeysetConnectionField(DjangoFilterConnectionField):
+    """Filter connection that pages with ``WHERE key > cursor LIMIT first + 1``.
+
+    Offset pagination counts the whole result and then slices at an
+    offset, so both get slower the deeper a client pages. Here the cursor
+    holds the ordering value and pk of its row, so every page is one
+    indexed range query, and the extra row tells whether there is another
+    page. ``last``/``before`` read the same range backwards. Multi-column
+    orderings fall back to the default offset pagination and its cursors.
+    """
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        iterable = maybe_queryset(iterable)
+        ordering = _keyset_ordering(iterable) if isinstance(iterable, QuerySet) else None
+        if ordering is None:
+            for arg in ("after", "before"):
+                if args.get(arg) and cursor_to_offset(args[arg]) is None:
+                    raise Exception("Invalid cursor")
+            return super().resolve_connection(connection, args, iterable, max_limit=max_limit)
+
+        first, last = args.get("first"), args.get("last")
+        for arg, value in (("first", first), ("last", last)):
+            if value is not None and value < 0:
+                raise ValueError(f"Argument '{arg}' must be a non-negative integer.")
+        after, before = args.get("after"), args.get("before")
+        offset = args.get("offset") or 0
+        if first is None and last is None:
+            first = max_limit
+
+        field, descending = ordering
+        direction = "-" if descending else ""
+        forward, backward = ("lt", "gt") if descending else ("gt", "lt")
+        queryset = iterable.order_by(direction + field, direction + "pk")
+        if after:
+            queryset = queryset.filter(_beyond(field, *decode_cursor(after, field), forward))
+        if before:
+            queryset = queryset.filter(_beyond(field, *decode_cursor(before, field), backward))
+
+        if first is None and last is not None:
+            if offset:
+                raise Exception("offset cannot be combined with last")
+            # Read the rows nearest the end of the range in reverse, then flip them.
+            nodes = list(queryset.reverse()[: last + 1])
+            has_previous_page = len(nodes) > last
+            nodes = nodes[:last][::-1]
+            has_next_page = bool(before)
+        else:
+            end = None if first is None else offset + first + 1
+            nodes = list(queryset[offset:end])
+            has_next_page = first is not None and len(nodes) > first
+            nodes = nodes[:first]
+            has_previous_page = bool(after) or offset > 0
+            if last is not None:
+                has_previous_page = has_previous_page or len(nodes) > last
+                nodes = nodes[max(len(nodes) - last, 0):]
+
+        edges = [connection.Edge(node=node, cursor=encode_cursor(node, field)) for node in nodes]
+        connection = connection(
+            edges=edges,
+            page_info=PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=has_previous_page,
+                has_next_page=has_next_page,
+            ),
+        )
+        connection.iterable = queryset
+        return connection
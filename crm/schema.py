@@ -1,7 +1,8 @@
 import graphene
-from graphene_django.filter import DjangoFilterConnectionField
 from .models import Customer, Product, Order
 from .filters import CustomerFilter, ProductFilter, OrderFilter
+from .optimizer import optimize_queryset
+from .pagination import KeysetConnectionField
 from graphene_django import DjangoObjectType
 
 # Types
@@ -11,12 +12,19 @@ class CustomerNode(DjangoObjectType):
         filterset_class = CustomerFilter
         interfaces = (graphene.relay.Node,)
 
+    def resolve_orders(root, info, **kwargs):
+        # Nested connections run their own query per page, so shape it here.
+        return optimize_queryset(root.orders.all(), info)
+
 class ProductNode(DjangoObjectType):
     class Meta:
         model = Product
         filterset_class = ProductFilter
         interfaces = (graphene.relay.Node,)
 
+    def resolve_orders(root, info, **kwargs):
+        return optimize_queryset(root.orders.all(), info)
+
 class OrderNode(DjangoObjectType):
     class Meta:
         model = Order
@@ -24,28 +32,35 @@ class OrderNode(DjangoObjectType):
         interfaces = (graphene.relay.Node,)
 
 # Query
+MAX_PAGE_SIZE = 100
+
 class Query(graphene.ObjectType):
-    all_customers = DjangoFilterConnectionField(CustomerNode, order_by=graphene.List(of_type=graphene.String))
-    all_products = DjangoFilterConnectionField(ProductNode, order_by=graphene.List(of_type=graphene.String))
-    all_orders = DjangoFilterConnectionField(OrderNode, order_by=graphene.List(of_type=graphene.String))
+    all_customers = KeysetConnectionField(CustomerNode, order_by=graphene.List(of_type=graphene.String))
+    all_products = KeysetConnectionField(ProductNode, order_by=graphene.List(of_type=graphene.String))
+    all_orders = KeysetConnectionField(
+        OrderNode,
+        order_by=graphene.List(of_type=graphene.String),
+        max_limit=MAX_PAGE_SIZE,
+        enforce_first_or_last=True,
+    )
 
     def resolve_all_customers(self, info, order_by=None, **kwargs):
         qs = Customer.objects.all()
         if order_by:
             qs = qs.order_by(*order_by)
-        return qs
+        return optimize_queryset(qs, info)
 
     def resolve_all_products(self, info, order_by=None, **kwargs):
         qs = Product.objects.all()
         if order_by:
             qs = qs.order_by(*order_by)
-        return qs
+        return optimize_queryset(qs, info)
 
     def resolve_all_orders(self, info, order_by=None, **kwargs):
         qs = Order.objects.all()
         if order_by:
             qs = qs.order_by(*order_by)
-        return qs
+        return optimize_queryset(qs, info)
 import graphene
 from graphene_django import DjangoObjectType
 from crm.models import Product   # <= لازم تكون كده
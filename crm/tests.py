@@ -1,3 +1,332 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import graphene
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from graphql_relay import offset_to_cursor
+
+import graphql_crm.schema
+from alx_backend_graphql_crm.schema import schema
+
+from .models import Customer, Order, Product
+
+CUSTOMERS_PAGE = """
+query ($first: Int, $last: Int, $after: String, $before: String) {
+    allCustomers(first: $first, last: $last, after: $after, before: $before) {
+        edges { node { email } }
+        pageInfo { hasNextPage hasPreviousPage startCursor endCursor }
+    }
+}
+"""
+
+# The list queries and mutations in graphql_crm are not mounted on the project schema.
+graphql_crm_schema = graphene.Schema(
+    query=graphql_crm.schema.Query, mutation=graphql_crm.schema.Mutation
+)
+
+ORDERS_PAGE = """
+query ($first: Int, $after: String) {
+    allOrders(first: $first, after: $after) {
+        edges { node { totalAmount } }
+        pageInfo { hasNextPage endCursor }
+    }
+}
+"""
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated names force the pk tie-breaker into the cursors.
+        for i, name in enumerate("abbbcde"):
+            Customer.objects.create(name=name, email=f"c{i}@example.com")
+        cls.emails = list(Customer.objects.order_by("name", "pk").values_list("email", flat=True))
+
+        customer = Customer.objects.first()
+        now = timezone.now()
+        for i in range(5):
+            Order.objects.create(
+                customer=customer, total_amount=i, order_date=now - timedelta(days=i // 2)
+            )
+        cls.totals = [
+            str(order.total_amount) for order in Order.objects.order_by("-order_date", "-pk")
+        ]
+
+    def page(self, query, field, **variables):
+        result = schema.execute(query, variable_values=variables)
+        self.assertIsNone(result.errors)
+        connection = result.data[field]
+        values = [next(iter(edge["node"].values())) for edge in connection["edges"]]
+        return values, connection["pageInfo"]
+
+    def walk(self, query, field, first):
+        pages, after = [], None
+        while True:
+            values, page_info = self.page(query, field, first=first, after=after)
+            pages.append(values)
+            if not page_info["hasNextPage"]:
+                return pages
+            after = page_info["endCursor"]
+
+    def test_forward_paging_with_ties_on_name(self):
+        pages = self.walk(CUSTOMERS_PAGE, "allCustomers", first=2)
+        self.assertEqual(sum(pages, []), self.emails)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+    def test_paging_by_descending_order_date(self):
+        pages = self.walk(ORDERS_PAGE, "allOrders", first=2)
+        self.assertEqual(sum(pages, []), self.totals)
+
+    def test_has_next_page(self):
+        _, page_info = self.page(CUSTOMERS_PAGE, "allCustomers", first=len(self.emails) - 1)
+        self.assertTrue(page_info["hasNextPage"])
+        _, page_info = self.page(CUSTOMERS_PAGE, "allCustomers", first=len(self.emails))
+        self.assertFalse(page_info["hasNextPage"])
+        self.assertFalse(page_info["hasPreviousPage"])
+
+    def test_cursor_round_trip_forward_and_backward(self):
+        _, first_page = self.page(CUSTOMERS_PAGE, "allCustomers", first=3)
+        second, second_page = self.page(
+            CUSTOMERS_PAGE, "allCustomers", first=3, after=first_page["endCursor"]
+        )
+        self.assertEqual(second, self.emails[3:6])
+
+        back, back_page = self.page(
+            CUSTOMERS_PAGE, "allCustomers", last=2, before=second_page["startCursor"]
+        )
+        self.assertEqual(back, self.emails[1:3])
+        self.assertTrue(back_page["hasPreviousPage"])
+        self.assertTrue(back_page["hasNextPage"])
+
+        forward, _ = self.page(CUSTOMERS_PAGE, "allCustomers", first=2, after=back_page["endCursor"])
+        self.assertEqual(forward, self.emails[3:5])
+
+        tail, tail_page = self.page(CUSTOMERS_PAGE, "allCustomers", last=2)
+        self.assertEqual(tail, self.emails[-2:])
+        self.assertFalse(tail_page["hasNextPage"])
+
+    def test_rejects_cursors_it_did_not_issue(self):
+        for cursor in ("NQ==", offset_to_cursor(3), "not base64!"):
+            for variables in ({"first": 2, "after": cursor}, {"last": 2, "before": cursor}):
+                result = schema.execute(CUSTOMERS_PAGE, variable_values=variables)
+                self.assertEqual([error.message for error in result.errors], ["Invalid cursor"])
+
+    def test_rejects_negative_page_sizes(self):
+        for arg in ("first", "last"):
+            result = schema.execute(CUSTOMERS_PAGE, variable_values={arg: -1})
+            self.assertEqual(
+                [error.message for error in result.errors],
+                [f"Argument '{arg}' must be a non-negative integer."],
+            )
+
+
+class OptimizeQuerysetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        products = [Product.objects.create(name=f"p{i}", price=1) for i in range(3)]
+        for i in range(4):
+            customer = Customer.objects.create(name=f"c{i}", email=f"c{i}@example.com")
+            order = Order.objects.create(customer=customer, total_amount=3)
+            order.products.set(products)
+
+    def test_nested_selection_does_not_query_per_order(self):
+        query = """
+        {
+            allOrders(first: 10) {
+                edges { node { totalAmount customer { name } products { name } } }
+            }
+        }
+        """
+        # One query for orders joined to customers, one for all their products.
+        with self.assertNumQueries(2):
+            result = schema.execute(query)
+        self.assertIsNone(result.errors)
+        edges = result.data["allOrders"]["edges"]
+        self.assertEqual(len(edges), 4)
+        self.assertTrue(all(len(edge["node"]["products"]) == 3 for edge in edges))
+
+    def test_scalar_selection_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            result = schema.execute("{ allCustomers(first: 10) { edges { node { name } } } }")
+        self.assertIsNone(result.errors)
+        self.assertEqual(len(result.data["allCustomers"]["edges"]), 4)
+
+    def test_nested_order_connection_batches_products_per_page(self):
+        for customer in Customer.objects.all():
+            for _ in range(2):
+                order = Order.objects.create(customer=customer, total_amount=3)
+                order.products.set(Product.objects.all())
+        query = """
+        {
+            allCustomers(first: 10) {
+                edges { node { orders(first: 5) { edges { node { products { name } } } } } }
+            }
+        }
+        """
+        # The customers, then per customer: the count, the page of orders and
+        # one query for the products of every order on that page.
+        with self.assertNumQueries(1 + 4 * 3):
+            result = schema.execute(query)
+        self.assertIsNone(result.errors)
+        for edge in result.data["allCustomers"]["edges"]:
+            orders = edge["node"]["orders"]["edges"]
+            self.assertEqual(len(orders), 3)
+            self.assertTrue(all(len(order["node"]["products"]) == 3 for order in orders))
+
+    def test_id_only_products_are_prefetched_in_name_order(self):
+        order = Order.objects.first()
+        order.products.set([Product.objects.create(name=name, price=1) for name in "zay"])
+        with self.assertNumQueries(2):
+            result = graphql_crm_schema.execute("{ orders { id products { id } } }")
+        self.assertIsNone(result.errors)
+        products = {
+            node["id"]: [product["id"] for product in node["products"]]
+            for node in result.data["orders"]
+        }
+        by_name = [str(pk) for pk in order.products.order_by("name").values_list("pk", flat=True)]
+        self.assertEqual(products[str(order.pk)], by_name)
+
+
+CREATE_ORDER = """
+mutation ($customerId: ID!, $productIds: [ID]!) {
+    createOrder(customerId: $customerId, productIds: $productIds) {
+        order { id totalAmount customer { email } products { name } }
+    }
+}
+"""
+
+
+class CreateOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = Customer.objects.create(name="c", email="c@example.com")
+        cls.products = [
+            Product.objects.create(name="a", price="10.10"),
+            Product.objects.create(name="b", price="20.20"),
+        ]
+
+    def create_order(self, customer_id, product_ids):
+        return graphql_crm_schema.execute(
+            CREATE_ORDER, variable_values={"customerId": customer_id, "productIds": product_ids}
+        )
+
+    def assertError(self, result, message):
+        self.assertEqual([error.message for error in result.errors], [message])
+        self.assertFalse(Order.objects.exists())
+
+    def test_creates_order_with_quantized_total_and_through_rows(self):
+        product_ids = [product.pk for product in self.products]
+        result = self.create_order(self.customer.pk, product_ids)
+        self.assertIsNone(result.errors)
+        payload = result.data["createOrder"]["order"]
+        self.assertEqual(payload["totalAmount"], "30.30")
+        self.assertEqual(payload["customer"], {"email": "c@example.com"})
+        self.assertEqual(payload["products"], [{"name": "a"}, {"name": "b"}])
+
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount, Decimal("30.30"))
+        self.assertEqual(order.total_amount.as_tuple().exponent, -2)
+        links = Order.products.through.objects.filter(order=order)
+        self.assertEqual(sorted(links.values_list("product_id", flat=True)), product_ids)
+
+    def test_invalid_customer_leaves_no_order(self):
+        # TestCase wraps each test in a transaction, so a deferred foreign key
+        # check would not fire before the assertion.
+        result = self.create_order(9999, [self.products[0].pk])
+        self.assertError(result, "Invalid customer ID")
+
+    def test_invalid_customer_is_reported_before_invalid_products(self):
+        self.assertError(self.create_order(9999, [9998]), "Invalid customer ID")
+        self.assertError(self.create_order(9999, []), "Invalid customer ID")
+
+    def test_names_missing_product_ids(self):
+        result = self.create_order(self.customer.pk, [self.products[0].pk, 9998, 9999])
+        self.assertError(result, "One or more product IDs are invalid: 9998, 9999")
+
+    def test_requires_a_product(self):
+        result = self.create_order(self.customer.pk, [])
+        self.assertError(result, "At least one product must be selected")
+
+
+BULK_CREATE_CUSTOMERS = """
+mutation ($input: [JSONString]!) {
+    bulkCreateCustomers(input: $input) { customers { email } errors }
+}
+"""
+
+
+class BulkCreateCustomersTests(TestCase):
+    def bulk_create(self, *rows):
+        result = graphql_crm_schema.execute(
+            BULK_CREATE_CUSTOMERS, variable_values={"input": [json.dumps(row) for row in rows]}
+        )
+        self.assertIsNone(result.errors)
+        payload = result.data["bulkCreateCustomers"]
+        return [customer["email"] for customer in payload["customers"]], payload["errors"]
+
+    def test_rejects_case_variants_within_the_batch(self):
+        created, errors = self.bulk_create(
+            {"name": "a", "email": "a@example.com"}, {"name": "A", "email": "A@Example.com"}
+        )
+        self.assertEqual(created, ["a@example.com"])
+        self.assertEqual(errors, ["Email already exists: A@Example.com"])
+
+    def test_rejects_case_variants_of_stored_emails(self):
+        Customer.objects.create(name="b", email="b@example.com")
+        created, errors = self.bulk_create({"name": "B", "email": "B@example.com"})
+        self.assertEqual(created, [])
+        self.assertEqual(errors, ["Email already exists: B@example.com"])
+        self.assertEqual(Customer.objects.count(), 1)
+
+    def test_reports_errors_in_input_order(self):
+        Customer.objects.create(name="b", email="b@example.com")
+        created, errors = self.bulk_create(
+            {"name": "x", "email": "x@example.com", "phone": "nope"},
+            {"email": "y@example.com"},
+            {"name": "b", "email": "b@example.com"},
+            {"name": None, "email": "z@example.com"},
+            {"name": "ok", "email": "ok@example.com", "phone": "+1-555-123-4567"},
+        )
+        self.assertEqual(created, ["ok@example.com"])
+        self.assertEqual(errors, [
+            "Invalid phone format: nope",
+            "Missing field: 'name'",
+            "Email already exists: b@example.com",
+            "Invalid name: None",
+        ])
+
+    def test_retries_without_emails_taken_after_the_check(self):
+        existing_emails = graphql_crm.schema._existing_emails
+
+        def racing_existing_emails(emails):
+            # Another request stores a case variant right after the upfront check.
+            if not Customer.objects.exists():
+                Customer.objects.create(name="r", email="r@example.com")
+                return set()
+            return existing_emails(emails)
+
+        with mock.patch("graphql_crm.schema._existing_emails", side_effect=racing_existing_emails):
+            created, errors = self.bulk_create(
+                {"name": "R", "email": "R@example.com"}, {"name": "s", "email": "s@example.com"}
+            )
+        self.assertEqual(created, ["s@example.com"])
+        self.assertEqual(errors, ["Email already exists: R@example.com"])
+        self.assertEqual(
+            sorted(Customer.objects.values_list("email", flat=True)),
+            ["r@example.com", "s@example.com"],
+        )
+
+    @override_settings(CRM_BULK_BATCH_SIZE=2)
+    def test_inserts_in_batches_of_the_configured_size(self):
+        rows = [{"name": f"n{i}", "email": f"n{i}@example.com"} for i in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            created, errors = self.bulk_create(*rows)
+        self.assertEqual(len(created), 5)
+        self.assertEqual(errors, [])
+        inserts = [query for query in queries if query["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 3)
@@ -1,9 +1,14 @@
 import re
+from decimal import ROUND_HALF_UP, Decimal
 import graphene
 from graphene_django import DjangoObjectType
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, Sum
+from django.db.models.functions import Lower
 from django.utils import timezone
-from .models import Customer, Product, Order
+from crm.models import Customer, Product, Order
+from crm.optimizer import optimize_queryset
 
 # --------------------
 # GraphQL Types
@@ -23,9 +28,44 @@ class OrderType(DjangoObjectType):
         model = Order
         fields = ("id", "customer", "products", "total_amount", "order_date")
 
+    customer = graphene.Field(CustomerType, required=True)
+
 # --------------------
 # Mutations
 # --------------------
+PHONE_REGEX = re.compile(r"^\+?\d{1,4}?[-.\s]?\(?\d{1,3}?\)?[-.\s]?\d{3}[-.\s]?\d{4}$")
+_PHONE_MATCH = PHONE_REGEX.match
+
+def _existing_emails(emails):
+    """Return which of the given lowercased emails already belong to a customer."""
+    return set(
+        Customer.objects.annotate(email_lower=Lower("email"))
+        .filter(email_lower__in=emails)
+        .values_list("email_lower", flat=True)
+    )
+
+def _insert_customers(pending, errors):
+    """Bulk insert ``pending``, reporting rows whose email was taken meanwhile."""
+    if not pending:
+        return []
+    batch_size = getattr(settings, "CRM_BULK_BATCH_SIZE", 1000)
+    try:
+        with transaction.atomic():
+            return Customer.objects.bulk_create(pending, batch_size=batch_size)
+    except IntegrityError:
+        # Another request stored one of these emails after the upfront check;
+        # the case-insensitive unique constraint caught it, so drop the rows
+        # that lost the race.
+        taken = _existing_emails({cust.email.lower() for cust in pending})
+        if not taken:
+            # Not an email conflict; let the original error through.
+            raise
+        errors.extend(
+            f"Email already exists: {cust.email}" for cust in pending if cust.email.lower() in taken
+        )
+        pending = [cust for cust in pending if cust.email.lower() not in taken]
+        return Customer.objects.bulk_create(pending, batch_size=batch_size)
+
 class CreateCustomer(graphene.Mutation):
     class Arguments:
         name = graphene.String(required=True)
@@ -37,14 +77,14 @@ class CreateCustomer(graphene.Mutation):
 
     def mutate(self, info, name, email, phone=None):
         # Validate unique email
-        if Customer.objects.filter(email=email).exists():
+        if _existing_emails({email.lower()}):
             raise Exception("Email already exists")
 
         # Validate phone format
-        if phone and not re.match(r"^\+?\d{1,4}?[-.\s]?\(?\d{1,3}?\)?[-.\s]?\d{3}[-.\s]?\d{4}$", phone):
+        if phone and not _PHONE_MATCH(phone):
             raise Exception("Invalid phone format")
 
-        customer = Customer.objects.create(name=name, email=email, phone=phone)
+        customer = Customer.objects.create(name=name, email=email, phone=phone or "")
         return CreateCustomer(customer=customer, message="Customer created successfully")
 
 class BulkCreateCustomers(graphene.Mutation):
@@ -56,33 +96,48 @@ class BulkCreateCustomers(graphene.Mutation):
 
     @transaction.atomic
     def mutate(self, info, input):
-        created_customers = []
+        pending = []
         errors = []
 
+        match_phone = _PHONE_MATCH
+
+        # Read every row once up front; the checks below work on plain tuples.
+        # A row that cannot be read keeps its place as its error message.
+        rows = []
         for data in input:
             try:
-                name = data["name"]
-                email = data["email"]
-                phone = data.get("phone")
-
-                if Customer.objects.filter(email=email).exists():
-                    errors.append(f"Email already exists: {email}")
-                    continue
-
-                if phone and not re.match(r"^\+?\d{1,4}?[-.\s]?\(?\d{1,3}?\)?[-.\s]?\d{3}[-.\s]?\d{4}$", phone):
-                    errors.append(f"Invalid phone format: {phone}")
-                    continue
-
-                cust = Customer(name=name, email=email, phone=phone)
-                cust.save()
-                created_customers.append(cust)
-
+                name, email, phone = data["name"], data["email"], data.get("phone")
+                for field, value in (("name", name), ("email", email), ("phone", phone)):
+                    if not isinstance(value, str) and not (field == "phone" and value is None):
+                        raise ValueError(f"Invalid {field}: {value!r}")
+                rows.append((name, email, email.lower(), phone, not phone or bool(match_phone(phone))))
             except KeyError as e:
-                errors.append(f"Missing field: {e}")
-
+                rows.append(f"Missing field: {e}")
             except Exception as e:
-                errors.append(str(e))
-
+                rows.append(str(e))
+
+        emails = {row[2] for row in rows if not isinstance(row, str)}
+        if not emails:
+            return BulkCreateCustomers(customers=[], errors=rows)
+
+        # One indexed lookup for the submitted emails instead of one per row.
+        existing_emails = _existing_emails(emails)
+        seen_emails = set()
+
+        for row in rows:
+            if isinstance(row, str):
+                errors.append(row)
+                continue
+            name, email, email_key, phone, phone_ok = row
+            if email_key in existing_emails or email_key in seen_emails:
+                errors.append(f"Email already exists: {email}")
+            elif not phone_ok:
+                errors.append(f"Invalid phone format: {phone}")
+            else:
+                seen_emails.add(email_key)
+                pending.append(Customer(name=name, email=email, phone=phone or ""))
+
+        created_customers = _insert_customers(pending, errors)
         return BulkCreateCustomers(customers=created_customers, errors=errors)
 
 class CreateProduct(graphene.Mutation):
@@ -111,26 +166,42 @@ class CreateOrder(graphene.Mutation):
     order = graphene.Field(OrderType)
 
     def mutate(self, info, customer_id, product_ids, order_date=None):
-        try:
-            customer = Customer.objects.get(pk=customer_id)
-        except Customer.DoesNotExist:
+        # The customer check rides along with the product aggregate: the
+        # filtered count is zero when the customer does not exist.
+        customer = Customer.objects.filter(pk=customer_id)
+        totals = Product.objects.filter(pk__in=product_ids).aggregate(
+            total=Sum("price"),
+            count=Count("id"),
+            customer_count=Count("id", filter=Exists(customer)),
+        )
+        if totals["count"]:
+            customer_exists = totals["customer_count"] > 0
+        else:
+            # No product rows were there to carry the check.
+            customer_exists = customer.exists()
+        if not customer_exists:
             raise Exception("Invalid customer ID")
 
-        products = Product.objects.filter(pk__in=product_ids)
-        if len(products) != len(product_ids):
-            raise Exception("One or more product IDs are invalid")
+        if totals["count"] != len(product_ids):
+            found = Product.objects.only("id").in_bulk(product_ids)
+            to_pk = Product._meta.pk.to_python
+            missing = [str(pid) for pid in product_ids if to_pk(pid) not in found]
+            message = "One or more product IDs are invalid"
+            raise Exception(f"{message}: {', '.join(missing)}" if missing else message)
 
-        if not products:
+        if not product_ids:
             raise Exception("At least one product must be selected")
 
-        order = Order.objects.create(
-            customer=customer,
-            order_date=order_date or timezone.now()
-        )
-        order.products.set(products)
-        total = sum([p.price for p in products])
-        order.total_amount = total
-        order.save()
+        with transaction.atomic():
+            order = Order.objects.create(
+                customer_id=customer_id,
+                total_amount=totals["total"].quantize(Decimal("0.01"), rounding=ROUND_HALF_UP),
+                order_date=order_date or timezone.now()
+            )
+            OrderProducts = Order.products.through
+            OrderProducts.objects.bulk_create(
+                [OrderProducts(order_id=order.pk, product_id=pk) for pk in product_ids]
+            )
 
         return CreateOrder(order=order)
 
@@ -149,10 +220,10 @@ class Query(graphene.ObjectType):
     orders = graphene.List(OrderType)
 
     def resolve_customers(root, info):
-        return Customer.objects.all()
+        return optimize_queryset(Customer.objects.all(), info)
 
     def resolve_products(root, info):
-        return Product.objects.all()
+        return optimize_queryset(Product.objects.all(), info)
 
     def resolve_orders(root, info):
-        return Order.objects.all()
+        return optimize_queryset(Order.objects.all(), info)